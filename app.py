@@ -1,6 +1,8 @@
-import streamlit as st
+import asyncio
 import logging
 
+import streamlit as st
+
 from sec_extractor import fetch_sec_documents
 from ingest import ingest_documents
 from graph_rag import compile_rag_graph
@@ -16,11 +18,22 @@ st.set_page_config(
     layout="wide",
 )
 
+# --- SHARED RESOURCES ---
+@st.cache_resource
+def get_graph():
+    # The compiled graph is stateless (per-call state lives in GraphState),
+    # so one process-wide instance serves every session instead of paying a
+    # compile plus a set of LLM clients per user.
+    return compile_rag_graph()
+
+
 # --- SESSION STATE INITIALIZATION ---
 if "messages" not in st.session_state:
     st.session_state.messages = []
-if "graph" not in st.session_state:
-    st.session_state.graph = compile_rag_graph()
+if "rag_state" not in st.session_state:
+    # Carried across chat turns so follow-up questions can reuse the previous
+    # turn's retrieved documents and already-explained jargon.
+    st.session_state.rag_state = {"prev_question": "", "documents": [], "jargon_dict": {}}
 
 
 # --- SIDEBAR: DATA EXTRACTION & INGESTION ---
@@ -90,48 +103,78 @@ if prompt := st.chat_input("Ask a question about the filings..."):
         # UI Elements for Audit Trail
         status_container = st.status("AI Agent Thinking...", expanded=True)
         
-        # State Tracking Variables
+        # State Tracking Variables; prior-turn documents and jargon are passed
+        # in so the graph only delta-processes the new question.
         initial_state = {
+            **st.session_state.rag_state,
             "question": prompt,
             "loop_count": 0
         }
-        
+
         final_answer = ""
-        learned_jargon = {}
-        
+        final_documents = st.session_state.rag_state["documents"]
+        learned_jargon = dict(st.session_state.rag_state["jargon_dict"])
+
+        # Partial answer tokens render here as they arrive
+        answer_placeholder = st.empty()
+
+        async def stream_turn():
+            # astream_events surfaces both node completions (for the status
+            # trail) and per-token chat-model chunks, so the first words of
+            # the answer appear ~immediately instead of after the full
+            # completion returns.
+            global final_answer, final_documents
+            buffer = ""
+            async for event in get_graph().astream_events(initial_state, version="v2"):
+                kind = event["event"]
+
+                if kind == "on_chat_model_stream":
+                    if event.get("metadata", {}).get("langgraph_node") == "generate_answer":
+                        chunk = event["data"]["chunk"]
+                        if chunk.content:
+                            buffer += chunk.content
+                            answer_placeholder.markdown(buffer + "▌")
+                    continue
+
+                if kind != "on_chain_end":
+                    continue
+
+                node_name = event.get("name")
+                node_state = event.get("data", {}).get("output") or {}
+                if not isinstance(node_state, dict):
+                    continue
+
+                # Update status dynamically based on current node
+                if node_name == "retrieve":
+                    num_docs = len(node_state.get("documents", []))
+                    status_container.write(f"🔍 Retrieving documents... (Found {num_docs} chunks)")
+
+                elif node_name == "grade_documents":
+                    final_documents = node_state.get("documents", [])
+                    num_docs = len(final_documents)
+                    status_container.write(f"⚖️ Grading relevance... ({num_docs} chunks passed the relevance filter.)")
+                    jargon = node_state.get("jargon_dict", {})
+                    if jargon:
+                        learned_jargon.update(jargon)
+                        status_container.write(f"🧠 Translating {len(jargon)} financial terms into plain English...")
+
+                elif node_name == "rewrite_query":
+                    new_q = node_state.get("question", "")
+                    status_container.write(f"🔄 Documents lacked relevance. Rewriting query to: *'{new_q}'*")
+
+                elif node_name == "generate_answer":
+                    status_container.write("✍️ Synthesizing plain-English response...")
+                    final_answer = node_state.get("generation", "") or buffer
+
         try:
-            # Stream events from LangGraph
-            for output in st.session_state.graph.stream(initial_state):
-                for node_name, node_state in output.items():
-                    # Update status dynamically based on current node
-                    if node_name == "retrieve":
-                        num_docs = len(node_state.get("documents", []))
-                        status_container.write(f"🔍 Retrieving documents... (Found {num_docs} chunks)")
-                    
-                    elif node_name == "grade_documents":
-                        num_docs = len(node_state.get("documents", []))
-                        status_container.write(f"⚖️ Grading relevance... ({num_docs} chunks passed the relevance filter.)")
-                    
-                    elif node_name == "rewrite_query":
-                        new_q = node_state.get("question", "")
-                        status_container.write(f"🔄 Documents lacked relevance. Rewriting query to: *'{new_q}'*")
-                        
-                    elif node_name == "explain_jargon":
-                        jargon = node_state.get("jargon_dict", {})
-                        if jargon:
-                            learned_jargon.update(jargon)
-                            status_container.write(f"🧠 Translating {len(jargon)} financial terms into plain English...")
-                            
-                    elif node_name == "generate_answer":
-                        status_container.write("✍️ Synthesizing plain-English response...")
-                        final_answer = node_state.get("generation", "")
-                        
+            asyncio.run(stream_turn())
+
             # Close the status container
             status_container.update(label="✅ Answer Generated!", state="complete", expanded=False)
-            
+
             # Show final answer
-            st.markdown(final_answer)
-            
+            answer_placeholder.markdown(final_answer)
+
             # Show jargon expander if applicable
             if learned_jargon:
                 with st.expander("📚 Learned Financial Jargon", expanded=True):
@@ -141,11 +184,18 @@ if prompt := st.chat_input("Ask a question about the filings..."):
             
             # Save to history
             st.session_state.messages.append({
-                "role": "assistant", 
+                "role": "assistant",
                 "content": final_answer,
                 "jargon": learned_jargon
             })
 
+            # Persist this turn's results for the next turn
+            st.session_state.rag_state = {
+                "prev_question": prompt,
+                "documents": final_documents,
+                "jargon_dict": learned_jargon,
+            }
+
         except Exception as e:
             status_container.update(label="❌ Error generating response", state="error")
             st.error("There was an error answering your question. Make sure your GOOGLE_API_KEY is active and documents are ingested.")
@@ -1,6 +1,9 @@
 import os
-import json
+import re
+import math
+import asyncio
 import logging
+import functools
 from typing import List, Dict, Any, TypedDict
 
 from langchain_core.documents import Document
@@ -9,7 +12,7 @@ from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
 
 from langgraph.graph import START, END, StateGraph
-from ingest import get_retriever
+from ingest import get_retriever, get_ingest_generation, QueryCache, count_tokens
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,6 +25,7 @@ class GraphState(TypedDict):
     Represents the state of our LangGraph execution.
     """
     question: str
+    prev_question: str
     documents: List[Document]
     generation: str
     jargon_dict: Dict[str, str]
@@ -30,13 +34,137 @@ class GraphState(TypedDict):
 # -----------------------------------------------------------------------------
 # 2. Schema Definitions (Pydantic / Structured Output)
 # -----------------------------------------------------------------------------
-class GradeDocuments(BaseModel):
-    """Binary score for relevance check on retrieved documents."""
-    is_relevant: bool = Field(description="Documents contain info relevant to the user's question. Output 'True' if relevant, 'False' otherwise.")
+class DocAnalysis(BaseModel):
+    """Relevance grade plus extracted jargon for a single retrieved document."""
+    relevant: bool = Field(description="Document contains info relevant to the user's question. Output 'True' if relevant, 'False' otherwise.")
+    jargon: Dict[str, str] = Field(default_factory=dict, description="Technical financial terms found in the document mapped to simple 1-sentence plain-English definitions.")
+
+class GradeAndJargon(BaseModel):
+    """Batched analysis covering every retrieved document, in order."""
+    analyses: List[DocAnalysis] = Field(description="One analysis per document, in the same order the documents were given.")
+
+# -----------------------------------------------------------------------------
+# Shared LLM clients / chains
+# -----------------------------------------------------------------------------
+# Client construction pays auth + transport setup (dozens of ms), so each
+# chain is built exactly once and reused across invocations. The getters are
+# lazy (lru_cache) rather than plain module globals so importing this module
+# does not require GOOGLE_API_KEY to be configured yet.
+
+_GRADE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a financial analysis grader helping a complete beginner. For EACH numbered document below, do two things: \n
+    1. Grade its relevance to the user question. If the document contains keyword(s) or semantic meaning related to the question, grade it as relevant. \n
+    It does not need to be a stringent test; the goal is only to filter out entirely unrelated retrievals. \n
+    2. Identify any highly technical financial, accounting, or SEC-specific terms in it (e.g., Amortization, EBITDA, Derivatives) and give each a very simple, 1-sentence plain-English analogy or definition. \n
+    Return exactly one analysis per document, in the same order the documents are listed."""),
+    ("human", "Documents:\n\n{documents}\n\nUser question: {question}"),
+])
+
+_REWRITE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an AI generating an improved question optimized for database retrieval. \n
+    Look at the input question and try to reason about the underlying semantic intent / keywords."""),
+    ("human", "Initial question: {question} \n\n Formulate an improved, highly-searchable question."),
+])
+
+
+@functools.lru_cache(maxsize=1)
+def _grade_chain():
+    llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0)
+    return _GRADE_PROMPT | llm.with_structured_output(GradeAndJargon)
+
+
+@functools.lru_cache(maxsize=1)
+def _rewrite_chain():
+    return _REWRITE_PROMPT | ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0)
+
+
+@functools.lru_cache(maxsize=1)
+def _answer_llm():
+    return ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.2)
 
 # -----------------------------------------------------------------------------
 # 3. Graph Nodes
 # -----------------------------------------------------------------------------
+
+# Retrieval results cached per normalized question (chat users often repeat
+# or lightly refine questions). Keys include the ingest generation so the
+# cache self-invalidates after a re-ingest.
+_RETRIEVAL_CACHE = QueryCache(max_size=512, ttl=300.0)
+
+# Lexical prefilter: chunks whose (max-normalized) BM25 score against the
+# question falls below this are rejected without spending grader tokens.
+_PREFILTER_LO = 0.05
+
+try:
+    from rank_bm25 import BM25Okapi
+except ImportError:
+    BM25Okapi = None
+
+_WORD_RE = re.compile(r"\w+")
+
+# Follow-up questions at least this cosine-similar to the previous turn's
+# question reuse the previous turn's documents instead of re-retrieving.
+_REUSE_SIM_THRESHOLD = 0.9
+
+# Hard prompt-token budgets. Flash-model latency is roughly linear in input
+# tokens, so uncapped contexts make long retrievals balloon every call.
+_GRADE_TOKEN_BUDGET = 6000
+_ANSWER_TOKEN_BUDGET = 12000
+
+
+def _pack_documents(documents: List[Document], budget: int) -> List[Document]:
+    """
+    Greedy-pack documents (kept in retrieval score order) until the token
+    budget is hit. The first document is always included.
+    """
+    packed = []
+    total = 0
+    for doc in documents:
+        tokens = count_tokens(doc.page_content)
+        if packed and total + tokens > budget:
+            break
+        packed.append(doc)
+        total += tokens
+    if len(packed) < len(documents):
+        logger.info(f"-> Token budget {budget}: kept {len(packed)}/{len(documents)} chunks.")
+    return packed
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = math.sqrt(sum(x * x for x in a))
+    norm_b = math.sqrt(sum(x * x for x in b))
+    if not norm_a or not norm_b:
+        return 0.0
+    return dot / (norm_a * norm_b)
+
+
+def _lexical_scores(question: str, texts: List[str]) -> List[float]:
+    """
+    Score question/chunk token overlap, normalized to [0, 1] by the max.
+    Uses BM25 when rank_bm25 is installed, Jaccard overlap otherwise.
+    Returns all-zero scores when there is no lexical overlap at all.
+    """
+    q_tokens = _WORD_RE.findall(question.lower())
+    doc_tokens = [_WORD_RE.findall(t.lower()) for t in texts]
+    if not q_tokens or not any(doc_tokens):
+        return [0.0] * len(texts)
+
+    if BM25Okapi is not None:
+        scores = list(BM25Okapi(doc_tokens).get_scores(q_tokens))
+    else:
+        q_set = set(q_tokens)
+        scores = [
+            len(q_set & set(tokens)) / len(q_set | set(tokens)) if tokens else 0.0
+            for tokens in doc_tokens
+        ]
+
+    top = max(scores)
+    if top <= 0:
+        return [0.0] * len(texts)
+    return [s / top for s in scores]
+
+
 def retrieve_node(state: GraphState):
     """
     Retrieve documents from ChromaDB based on the current question.
@@ -44,51 +172,93 @@ def retrieve_node(state: GraphState):
     logger.info("---RETRIEVE DOCUMENTS---")
     question = state["question"]
     loop_count = state.get("loop_count", 0)
-    
-    # Initialize retriever
-    retriever = get_retriever()
-    documents = retriever.invoke(question)
-    
+
+    # Session reuse: when a follow-up is semantically close to the previous
+    # turn's question, its documents still cover the intent; skip the ANN
+    # search. Both query embeddings come out of the persistent cache.
+    prev_question = state.get("prev_question") or ""
+    prior_docs = state.get("documents") or []
+    if prior_docs and prev_question and loop_count == 0:
+        retriever = get_retriever()
+        similarity = _cosine(
+            retriever.embed_query(question), retriever.embed_query(prev_question)
+        )
+        if similarity >= _REUSE_SIM_THRESHOLD:
+            logger.info(f"-> Reusing previous turn's documents (similarity={similarity:.3f}).")
+            return {"documents": prior_docs, "question": question, "loop_count": loop_count}
+
+    cache_key = (get_ingest_generation(), question.strip().lower())
+    documents = _RETRIEVAL_CACHE.get(cache_key)
+
+    if documents is None:
+        retriever = get_retriever()
+        documents = retriever.invoke(question)
+        _RETRIEVAL_CACHE.put(cache_key, documents)
+    else:
+        logger.info("-> Served retrieval from cache.")
+
     return {"documents": documents, "question": question, "loop_count": loop_count}
 
-def grade_documents_node(state: GraphState):
+async def grade_documents_node(state: GraphState):
     """
-    Determines whether the retrieved documents are relevant to the question.
-    Filters out any irrelevant documents.
+    Grades every retrieved document for relevance AND extracts financial
+    jargon from it, in a single batched LLM call. Both tasks consume the
+    same chunks, so fusing them halves the prompt tokens and round-trips
+    compared to separate grade/explain nodes.
     """
-    logger.info("---GRADE DOCUMENTS---")
+    logger.info("---GRADE DOCUMENTS & EXTRACT JARGON---")
     question = state["question"]
     documents = state["documents"]
     loop_count = state["loop_count"]
-    
-    # Setup LLM with structured output
-    llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0)
-    structured_llm_grader = llm.with_structured_output(GradeDocuments)
-    
-    system_prompt = """You are a grader assessing the relevance of a retrieved document to a user question. \n 
-    If the document contains keyword(s) or semantic meaning related to the user question, grade it as relevant. \n
-    It does not need to be a stringent test. The goal is to filter out entirely unrelated retrievals."""
-    
-    grade_prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        ("human", "Retrieved document: \n\n {document} \n\n User question: {question}"),
-    ])
-    
-    retrieval_grader = grade_prompt | structured_llm_grader
-    
-    filtered_docs = []
-    for doc in documents:
-        score = retrieval_grader.invoke({"question": question, "document": doc.page_content})
-        grade = score.is_relevant
-        if grade:
-            logger.info("-> Document graded as relevant.")
-            filtered_docs.append(doc)
-        else:
-            logger.info("-> Document graded as NOT relevant. Skipping.")
-            
-    return {"documents": filtered_docs, "question": question, "loop_count": loop_count}
-
-def rewrite_query_node(state: GraphState):
+    # Terms already explained earlier in the session are kept, so follow-up
+    # turns do not lose (or re-explain) them.
+    known_jargon = state.get("jargon_dict") or {}
+
+    if not documents:
+        return {"documents": [], "jargon_dict": known_jargon, "question": question, "loop_count": loop_count}
+
+    # Cheap lexical prefilter: reject clearly-unrelated chunks before they
+    # cost grader tokens. Scores of all zero mean no lexical overlap at all,
+    # in which case we defer entirely to the semantic grader.
+    scores = _lexical_scores(question, [d.page_content for d in documents])
+    if any(scores):
+        survivors = [d for d, s in zip(documents, scores) if s >= _PREFILTER_LO]
+        rejected = len(documents) - len(survivors)
+        if rejected:
+            logger.info(f"-> Lexical prefilter rejected {rejected}/{len(documents)} chunks.")
+        documents = survivors
+        if not documents:
+            return {"documents": [], "jargon_dict": known_jargon, "question": question, "loop_count": loop_count}
+
+    documents = _pack_documents(documents, _GRADE_TOKEN_BUDGET)
+    numbered_docs = "\n\n".join(
+        f"Document {i + 1}:\n{doc.page_content}" for i, doc in enumerate(documents)
+    )
+
+    result = await _grade_chain().ainvoke({"question": question, "documents": numbered_docs})
+
+    analyses = result.analyses
+    if len(analyses) != len(documents):
+        # Misaligned response; keep every document rather than silently
+        # dropping some, but still use whatever jargon came back.
+        logger.warning(f"Grader returned {len(analyses)} analyses for {len(documents)} documents; keeping all.")
+        jargon_dict = dict(known_jargon)
+        for analysis in analyses:
+            jargon_dict.update(analysis.jargon)
+        return {"documents": documents, "jargon_dict": jargon_dict, "question": question, "loop_count": loop_count}
+
+    filtered_docs = [doc for doc, analysis in zip(documents, analyses) if analysis.relevant]
+
+    jargon_dict = dict(known_jargon)
+    for analysis in analyses:
+        if analysis.relevant:
+            jargon_dict.update(analysis.jargon)
+
+    logger.info(f"-> Kept {len(filtered_docs)}/{len(documents)} documents; {len(jargon_dict)} jargon terms to simplify.")
+
+    return {"documents": filtered_docs, "jargon_dict": jargon_dict, "question": question, "loop_count": loop_count}
+
+async def rewrite_query_node(state: GraphState):
     """
     Transform the query to produce a better question.
     """
@@ -96,64 +266,16 @@ def rewrite_query_node(state: GraphState):
     question = state["question"]
     documents = state["documents"]
     loop_count = state["loop_count"]
-    
-    llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0)
-    
-    system_prompt = """You are an AI generating an improved question optimized for database retrieval. \n
-    Look at the input question and try to reason about the underlying semantic intent / keywords."""
-    
-    rewrite_prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        ("human", f"Initial question: {question} \n\n Formulate an improved, highly-searchable question."),
-    ])
-    
-    question_rewriter = rewrite_prompt | llm
-    rewritten_question = question_rewriter.invoke({}).content
-    
+
+    response = await _rewrite_chain().ainvoke({"question": question})
+    rewritten_question = response.content
+
     # Increment the search loop counter
     loop_count += 1
-    
-    return {"question": rewritten_question, "documents": documents, "loop_count": loop_count}
 
-def explain_jargon_node(state: GraphState):
-    """
-    Analyzes documents to extract accounting and financial jargon, returning simple 1-sentence analogies.
-    """
-    logger.info("---EXPLAIN JARGON FOR BEGINNERS---")
-    documents = state["documents"]
-    
-    llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.1)
-    
-    # Provide the page content to the LLM
-    docs_text = "\n\n".join([d.page_content for d in documents])
-    
-    system_prompt = """You are an expert financial advisor talking to a complete beginner.
-    Identify any highly technical financial, accounting, or SEC-specific terms in the text below (e.g., Amortization, EBITDA, Derivatives).
-    Generate a very simple, 1-sentence plain-English analogy or definition for each technical term.
-    Produce the output strictly as a JSON dictionary mapping the term to its simplified definition.
-    Example: {{"Amortization": "A way of spreading out a big expense over time, like paying off a car loan in monthly chunks."}}"""
-    
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        ("human", f"Documents:\n\n{docs_text}")
-    ])
-    
-    chain = prompt | llm
-    response = chain.invoke({})
-    
-    # Try parsing JSON safely
-    jargon_dict = {}
-    try:
-        # Strip markdown block formatting if present
-        raw_output = response.content.replace("```json", "").replace("```", "").strip()
-        jargon_dict = json.loads(raw_output)
-        logger.info(f" -> Found {len(jargon_dict)} jargon terms to simplify.")
-    except Exception as e:
-        logger.warning(f"Failed to parse jargon dictionaries: {e}")
-
-    return {"jargon_dict": jargon_dict}
+    return {"question": rewritten_question, "documents": documents, "loop_count": loop_count}
 
-def generate_answer_node(state: GraphState):
+async def generate_answer_node(state: GraphState):
     """
     Generate the final synthesized answer.
     """
@@ -162,21 +284,25 @@ def generate_answer_node(state: GraphState):
     documents = state["documents"]
     loop_count = state["loop_count"]
     jargon_dict = state.get("jargon_dict", {})
-    
+
     if not documents and loop_count >= 3:
         logger.warning("Max retrieval loops reached without finding relevant documents.")
         return {"generation": "I'm sorry, I couldn't find enough relevant information in the SEC filings to answer your question accurately."}
-        
-    llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.2)
-    
-    docs_text = "\n\n---\n\n".join([d.page_content for d in documents])
+
+    docs_text = "\n\n---\n\n".join(
+        [d.page_content for d in _pack_documents(documents, _ANSWER_TOKEN_BUDGET)]
+    )
     # Format jargon for the prompt
+    # Single join instead of += in a loop (quadratic copying once the
+    # session's jargon dictionary grows large)
     jargon_text = ""
     if jargon_dict:
-        jargon_text = "Here is a list of complex terms found in the context with their simplified meanings:\n"
-        for k, v in jargon_dict.items():
-            jargon_text += f"- {k}: {v}\n"
-            
+        jargon_lines = [f"- {k}: {v}" for k, v in jargon_dict.items()]
+        jargon_text = (
+            "Here is a list of complex terms found in the context with their simplified meanings:\n"
+            + "\n".join(jargon_lines) + "\n"
+        )
+
     system_prompt = f"""You are a helpful, beginner-friendly financial assistant analyzing SEC documents.
     Answer the user's question using ONLY the provided document context.
     If you don't know the answer based strictly on the context, say you don't know.
@@ -190,9 +316,9 @@ def generate_answer_node(state: GraphState):
         ("human", f"Context: {docs_text}\n\nQuestion: {question}")
     ])
     
-    chain = prompt | llm
-    response = chain.invoke({})
-    
+    chain = prompt | _answer_llm()
+    response = await chain.ainvoke({})
+
     return {"generation": response.content}
 
 # -----------------------------------------------------------------------------
@@ -214,9 +340,9 @@ def grade_decision_edge(state: GraphState):
         logger.info("-> Decision: No relevant docs found. Rewriting Query.")
         return "rewrite"
     else:
-        # We have relevant documents! Move to simplify step.
-        logger.info("-> Decision: Relevant documents found. Proceeding to Explain Jargon.")
-        return "explain_jargon"
+        # We have relevant documents (and their jargon). Move to synthesis.
+        logger.info("-> Decision: Relevant documents found. Proceeding to Generate Answer.")
+        return "generate"
 
 # -----------------------------------------------------------------------------
 # 5. Graph Compilation
@@ -229,25 +355,22 @@ def compile_rag_graph():
     workflow.add_node("retrieve", retrieve_node)
     workflow.add_node("grade_documents", grade_documents_node)
     workflow.add_node("rewrite_query", rewrite_query_node)
-    workflow.add_node("explain_jargon", explain_jargon_node)
     workflow.add_node("generate_answer", generate_answer_node)
 
     # Compile edges
     workflow.add_edge(START, "retrieve")
     workflow.add_edge("retrieve", "grade_documents")
-    
+
     workflow.add_conditional_edges(
         "grade_documents",
         grade_decision_edge,
         {
-            "explain_jargon": "explain_jargon",
             "rewrite": "rewrite_query",
             "generate": "generate_answer"
         }
     )
-    
+
     workflow.add_edge("rewrite_query", "retrieve")
-    workflow.add_edge("explain_jargon", "generate_answer")
     workflow.add_edge("generate_answer", END)
 
     app = workflow.compile()
@@ -266,15 +389,19 @@ if __name__ == "__main__":
     }
     
     logger.info("Running test query through compiled LangGraph...")
-    
+
     try:
-        # We iterate over the steeam yielding the dictionary representing the node's output
-        for output in app.stream(initial_state):
-            for key, value in output.items():
-                logger.info(f"Finished Node: {key}")
-                
-        # To get the final state cleanly
-        final_state = app.invoke(initial_state)
+        # The nodes are coroutines, so the graph must run on an event loop
+        async def _run_test():
+            # We iterate over the stream yielding the dictionary representing the node's output
+            async for output in app.astream(initial_state):
+                for key, value in output.items():
+                    logger.info(f"Finished Node: {key}")
+
+            # To get the final state cleanly
+            return await app.ainvoke(initial_state)
+
+        final_state = asyncio.run(_run_test())
         print("\n==============================================")
         print("FINAL SYNTHESIZED ANSWER:")
         print("==============================================")
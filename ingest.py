@@ -1,5 +1,15 @@
 import os
+import re
 import glob
+import time
+import hashlib
+import sqlite3
+import threading
+import functools
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.documents import Document
 from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
@@ -13,26 +23,165 @@ logger = logging.getLogger(__name__)
 
 CHROMA_DB_DIR = os.path.join(os.path.dirname(__file__), "chroma_db")
 
+# Chunks are inserted into Chroma in fixed-size batches so the per-call HNSW
+# mutation / SQLite transaction / embedding HTTP overhead is amortized.
+# Gemini's embedding API rejects requests above ~50 texts, so we stay at 50
+# rather than Chroma's recommended 100-250.
+BATCH_SIZE = 50
+
+# Number of embedding requests kept in flight at once. Embedding is
+# network-latency-bound, so overlapping round-trips gives near-linear
+# speedup up to Gemini's concurrent-request quota.
+MAX_EMBED_WORKERS = 8
+
+EMB_CACHE_PATH = os.path.join(os.path.dirname(__file__), "emb_cache.sqlite")
+
+# Chunk budgets are measured in tokens, not characters: character counts
+# over/undershoot true token counts by 2-4x, which bloats every downstream
+# LLM prompt. Falls back to character-based sizing if tiktoken is missing.
+CHUNK_SIZE_TOKENS = 512
+CHUNK_OVERLAP_TOKENS = 64
+
+try:
+    import tiktoken
+    _ENC = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _ENC = None
+
+
+def count_tokens(text: str) -> int:
+    """Token count under the cached encoder (approximate char/4 without it)."""
+    if _ENC is None:
+        return len(text) // 4
+    return len(_ENC.encode(text, disallowed_special=()))
+
+
+class CachedEmbeddings:
+    """
+    Wraps an embeddings client with a persistent SQLite cache keyed by the
+    SHA-256 of the text. Re-ingesting after adding a single new filing only
+    pays Gemini API calls for chunks it has never seen before.
+    """
+
+    def __init__(self, inner, cache_path: str = EMB_CACHE_PATH):
+        self._inner = inner
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS emb (hash TEXT PRIMARY KEY, vec BLOB)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(kind: str, text: str) -> str:
+        # Document and query embeddings use different Gemini task types,
+        # so they are cached under separate namespaces.
+        return kind + ":" + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys):
+        with self._lock:
+            placeholders = ",".join("?" * len(keys))
+            rows = self._conn.execute(
+                f"SELECT hash, vec FROM emb WHERE hash IN ({placeholders})", keys
+            ).fetchall()
+        found = {}
+        for key, blob in rows:
+            vec = array("f")
+            vec.frombytes(blob)
+            found[key] = list(vec)
+        return found
+
+    def _store(self, items):
+        rows = [(key, array("f", vec).tobytes()) for key, vec in items]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO emb VALUES (?, ?)", rows)
+            self._conn.commit()
+
+    def embed_documents(self, texts):
+        keys = [self._key("d", t) for t in texts]
+        found = self._lookup(keys)
+        miss_indices = [i for i, k in enumerate(keys) if k not in found]
+
+        if miss_indices:
+            miss_vectors = self._inner.embed_documents([texts[i] for i in miss_indices])
+            self._store([(keys[i], vec) for i, vec in zip(miss_indices, miss_vectors)])
+            for i, vec in zip(miss_indices, miss_vectors):
+                found[keys[i]] = vec
+
+        return [found[k] for k in keys]
+
+    def embed_query(self, text):
+        key = self._key("q", text)
+        found = self._lookup([key])
+        if key in found:
+            return found[key]
+        vec = self._inner.embed_query(text)
+        self._store([(key, vec)])
+        return vec
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache with a TTL, used to short-circuit repeated
+    retrievals for the same (normalized) question. A hit turns an embedding
+    round-trip plus an ANN search into a dict lookup.
+    """
+
+    def __init__(self, max_size: int = 512, ttl: float = 300.0):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            timestamp, value = entry
+            if time.monotonic() - timestamp > self._ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+
+# Bumped whenever ingestion completes; included in retrieval cache keys so
+# cached results from before a re-ingest are never served afterwards.
+_INGEST_GENERATION = 0
+
+
+def get_ingest_generation() -> int:
+    return _INGEST_GENERATION
+
+# Matches our standard filename format {ticker}_{year}_{quarter}_{form_type}.txt
+# in one C-level pass instead of splitext/split per file. Applied to the
+# basename only, so underscores in parent directories cannot shift the fields.
+_FNAME_RE = re.compile(r"([^_]+)_([^_]+)_([^_]+)_([^_]+)")
+
+
 def parse_metadata_from_filename(filepath: str) -> dict:
     """
     Extracts metadata from our standard filename format:
     {ticker}_{year}_{quarter}_{form_type}.txt
     """
-    filename = os.path.basename(filepath)
-    name_without_ext = os.path.splitext(filename)[0]
-    parts = name_without_ext.split("_")
-    
-    metadata = {"source": filepath}
-    
-    if len(parts) >= 4:
-        metadata["Ticker"] = parts[0]
-        metadata["Year"] = parts[1]
-        metadata["Quarter"] = parts[2]
-        metadata["Form_Type"] = parts[3]
-    else:
-        logger.warning(f"Could not fully parse metadata from {filename}")
-        
-    return metadata
+    m = _FNAME_RE.match(os.path.basename(filepath))
+    if m is None:
+        logger.warning(f"Could not fully parse metadata from {os.path.basename(filepath)}")
+        return {"source": filepath}
+
+    return {
+        "source": filepath,
+        "Ticker": m[1],
+        "Year": m[2],
+        "Quarter": m[3],
+        "Form_Type": os.path.splitext(m[4])[0],
+    }
 
 def ingest_documents():
     data_dir = os.path.join(os.path.dirname(__file__), "data")
@@ -62,53 +211,128 @@ def ingest_documents():
         documents.extend(docs)
 
     logger.info("Splitting documents into chunks...")
+    if _ENC is None:
+        logger.warning("tiktoken not installed; falling back to character-based chunk sizing.")
     text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len,
+        chunk_size=CHUNK_SIZE_TOKENS,
+        chunk_overlap=CHUNK_OVERLAP_TOKENS,
+        length_function=count_tokens,
         is_separator_regex=False,
     )
-    
+
     chunks = text_splitter.split_documents(documents)
     logger.info(f"Created {len(chunks)} chunks.")
 
+    # SoA hot path: parallel lists of texts / metadatas / ids feed the
+    # embedding pipeline and chromadb's add() directly, instead of unpacking
+    # Document attributes in every tight loop below.
+    texts = [c.page_content for c in chunks]
+    metas = [c.metadata for c in chunks]
+    ids = [f"{meta.get('Ticker', 'doc')}-{i}" for i, meta in enumerate(metas)]
+    del chunks, documents
+
     logger.info("Initializing OpenAI Embeddings and persisting to ChromaDB...")
     
     # Ensure GOOGLE_API_KEY is set in .env
     if not os.getenv("GOOGLE_API_KEY"):
         logger.error("GOOGLE_API_KEY not found in environment. Cannot create embeddings.")
         return
-    embeddings = GoogleGenerativeAIEmbeddings(
+    embeddings = CachedEmbeddings(GoogleGenerativeAIEmbeddings(
         model="models/gemini-embedding-001",
         google_api_key=os.getenv("GOOGLE_API_KEY")
-    )
-    
+    ))
+
     # Initialize empty vectorstore
     vectorstore = Chroma(
         embedding_function=embeddings,
         persist_directory=CHROMA_DB_DIR
     )
     
-    # Gemini API has a strict batch limit (fails above 50 chunks per request)
-    batch_size = 50
-    for i in range(0, len(chunks), batch_size):
-        batch = chunks[i: i + batch_size]
-        logger.info(f"Adding batch {i//batch_size + 1}/{(len(chunks)-1)//batch_size + 1} ({len(batch)} chunks)")
-        vectorstore.add_documents(batch)
+    # Embed batches concurrently, then insert (text, vector) pairs through the
+    # low-level chromadb collection so Chroma never re-embeds anything.
+    batches = [texts[i: i + BATCH_SIZE] for i in range(0, len(texts), BATCH_SIZE)]
+
+    with ThreadPoolExecutor(max_workers=MAX_EMBED_WORKERS) as executor:
+        vectors_per_batch = list(executor.map(embeddings.embed_documents, batches))
+
+    vectors = [vec for batch_vecs in vectors_per_batch for vec in batch_vecs]
+
+    collection = vectorstore._collection
+    total_batches = (len(texts) - 1) // BATCH_SIZE + 1
+    for i in range(0, len(texts), BATCH_SIZE):
+        end = i + BATCH_SIZE
+        logger.info(f"Adding batch {i//BATCH_SIZE + 1}/{total_batches} ({len(texts[i:end])} chunks)")
+        # Deterministic ids + upsert keep re-ingesting an unchanged corpus
+        # idempotent instead of piling up duplicate rows.
+        collection.upsert(
+            ids=ids[i:end],
+            embeddings=vectors[i:end],
+            documents=texts[i:end],
+            metadatas=metas[i:end],
+        )
     
     # Force persistence to disk
     vectorstore.persist()
+
+    # Invalidate any cached retrievals taken against the old index
+    global _INGEST_GENERATION
+    _INGEST_GENERATION += 1
+
     logger.info(f"Successfully ingested and saved vectors to {CHROMA_DB_DIR}")
 
+# Number of chunks fetched per retrieval
+RETRIEVAL_K = 4
+
+
+class ChromaRetriever:
+    """
+    Thin retriever over the raw chromadb collection. Skips langchain's
+    VectorStoreRetriever dispatch, reuses one collection handle, and can
+    batch several query embeddings into a single ANN call.
+    """
+
+    def __init__(self, embeddings, k: int = RETRIEVAL_K):
+        self._embed = embeddings
+        self._k = k
+        self._coll = None
+
+    def _collection(self):
+        if self._coll is None:
+            import chromadb
+            client = chromadb.PersistentClient(path=CHROMA_DB_DIR)
+            # "langchain" is the default collection name used at ingest time
+            self._coll = client.get_or_create_collection("langchain")
+        return self._coll
+
+    def embed_query(self, question: str):
+        return self._embed.embed_query(question)
+
+    def invoke(self, question: str):
+        return self.invoke_many([question])[0]
+
+    def invoke_many(self, questions):
+        """Run several questions through one collection.query call."""
+        vectors = [self._embed.embed_query(q) for q in questions]
+        result = self._collection().query(
+            query_embeddings=vectors,
+            n_results=self._k,
+            include=["documents", "metadatas"],
+        )
+        return [
+            [Document(page_content=text, metadata=meta or {}) for text, meta in zip(texts, metas)]
+            for texts, metas in zip(result["documents"], result["metadatas"])
+        ]
+
+
+@functools.lru_cache(maxsize=1)
 def get_retriever():
     """Utility function for graph_rag.py to fetch the retriever"""
-    embeddings = GoogleGenerativeAIEmbeddings(
+    embeddings = CachedEmbeddings(GoogleGenerativeAIEmbeddings(
         model="gemini-embedding-001",
         google_api_key=os.getenv("GOOGLE_API_KEY")
-    )
-    vectorstore = Chroma(persist_directory=CHROMA_DB_DIR, embedding_function=embeddings)
-    # Return a retriever that fetches top 4 chunks
-    return vectorstore.as_retriever(search_kwargs={"k": 4})
+    ))
+    # Returns a retriever that fetches the top RETRIEVAL_K chunks
+    return ChromaRetriever(embeddings)
 
 if __name__ == "__main__":
     logger.info("Starting ingestion process...")
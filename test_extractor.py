@@ -1,50 +1,61 @@
 import os
 import sys
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from sec_extractor import fetch_sec_documents
 
 logging.basicConfig(level=logging.INFO)
 
-def run_tests():
-    print("=====================================================")
-    print(" Starting tests for SEC Extractor Module (Phase 1)   ")
-    print("=====================================================")
-    
-    # Test 1: Apple 10-K from 2023
-    print("[Test 1] Fetching AAPL 10-K for 2023")
-    docs_aapl = fetch_sec_documents(
-        tickers=["GOOG"],
-        form_types=["10-K"],
-        years=["2023"]
-    )
-    
-    print(f"\n-> Number of AAPL documents extracted: {len(docs_aapl)}")
-    for d in docs_aapl:
-        meta = d.metadata
-        print(f" -> {meta.get('Ticker')} | {meta.get('Form Type')}")
-        print(f"    Source: {meta.get('Source')}")
-        print(f"    Content Preview: {d.page_content[:150].replace(chr(10), ' ')}...\n")
-        
-    print("=====================================================")
-        
-    # Test 2: Microsoft 10-Q from 2023 Q1
-    print("\n[Test 2] Fetching MSFT 10-Q for 2023 (Quarter: Q1)")
-    docs_msft = fetch_sec_documents(
-        tickers=["NVDA"],
-        form_types=["10-Q"],
-        years=["2023"],
-        quarters=["Q1"]
-    )
-    
-    print(f"\n-> Number of MSFT documents extracted: {len(docs_msft)}")
-    for d in docs_msft:
+# Both cases are independent fetches, so they run concurrently below; the
+# module-level rate limiter in sec_extractor keeps the combined request
+# rate inside SEC's 10 req/s policy.
+TEST_CASES = [
+    {
+        "label": "Test 1: GOOG 10-K for 2023",
+        "tickers": ["GOOG"],
+        "form_types": ["10-K"],
+        "years": ["2023"],
+    },
+    {
+        "label": "Test 2: NVDA 10-Q for 2023 (Quarter: Q1)",
+        "tickers": ["NVDA"],
+        "form_types": ["10-Q"],
+        "years": ["2023"],
+        "quarters": ["Q1"],
+    },
+]
+
+
+def run_case(case: dict):
+    """Fetch one test case and return (label, documents)."""
+    params = {k: v for k, v in case.items() if k != "label"}
+    print(f"[{case['label']}] Fetching...")
+    docs = fetch_sec_documents(**params)
+    return case["label"], docs
+
+
+def report(label: str, docs):
+    print(f"\n-> [{label}] Number of documents extracted: {len(docs)}")
+    for d in docs:
         meta = d.metadata
         print(f" -> {meta.get('Ticker')} | {meta.get('Form Type')} | Quarter: {meta.get('Quarter')}")
         print(f"    Source: {meta.get('Source')}")
         print(f"    Content Preview: {d.page_content[:150].replace(chr(10), ' ')}...\n")
+    print("=====================================================")
 
+
+def run_tests():
     print("=====================================================")
+    print(" Starting tests for SEC Extractor Module (Phase 1)   ")
+    print("=====================================================")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(run_case, case) for case in TEST_CASES]
+        for future in as_completed(futures):
+            label, docs = future.result()
+            report(label, docs)
+
     print(" Tests complete. Check the 'data/' directory for exported files.")
     print("=====================================================")
 